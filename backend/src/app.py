@@ -8,6 +8,7 @@ from dotenv import load_dotenv
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
+from engine.batching_embedder import BatchingEmbedder
 from engine.embedder import Embedder
 from engine.hybrid_search import HybridSearch
 from engine.indexer import FaissIndex
@@ -46,7 +47,13 @@ BASE_DIR = Path(__file__).resolve().parent
 INDEX_PATH = BASE_DIR / "index" / "reviews.index"
 
 faiss_index = FaissIndex.load(INDEX_PATH)
-embedder = Embedder()
+# Concurrent requests share batched, de-duplicated Ollama calls
+embedder = BatchingEmbedder(
+    Embedder(),
+    max_batch_size=int(os.environ.get("EMBED_MAX_BATCH_SIZE", 32)),
+    max_wait_ms=float(os.environ.get("EMBED_BATCH_WINDOW_MS", 5)),
+    max_concurrency=int(os.environ.get("EMBED_MAX_CONCURRENCY", 2)),
+)
 conn = create_pg_connection()
 hybrid = HybridSearch(faiss_index, conn, embedder)
 
@@ -60,6 +67,10 @@ class SearchRequest(BaseModel):
 # --------------------------------------------------
 # Routes
 # --------------------------------------------------
+@app.on_event("shutdown")
+def shutdown():
+    embedder.close()
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
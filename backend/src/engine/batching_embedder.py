@@ -0,0 +1,207 @@
+"""Coalescing, micro-batching front end for an :class:`Embedder`.
+
+Concurrent callers (e.g. FastAPI worker threads serving ``/search/hybrid``)
+each ask for a handful of query embeddings. Instead of forwarding every call
+to Ollama on its own, texts are queued and a collector thread groups them
+into a batch once either ``max_wait_ms`` has elapsed since the first text was
+queued or ``max_batch_size`` unique texts are waiting. Batches are sent
+upstream by a small worker pool, so collection continues while a batch is in
+flight. Identical texts that are already in flight share one upstream slot.
+
+If a batch is rejected because of its input (an HTTP 4xx or a malformed
+response), it is bisected so only the offending texts fail. Connection
+errors, timeouts and 5xx responses fail the whole batch at once rather than
+multiplying calls against an unhealthy upstream.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+_STOP = object()
+
+
+class BatchingEmbedder:
+    def __init__(
+        self,
+        embedder,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        max_concurrency: int = 2,
+    ):
+        """
+        Args:
+            embedder: wrapped embedder exposing ``embed_batch(texts) -> np.ndarray``
+            max_batch_size: maximum number of unique texts per upstream call
+            max_wait_ms: how long to gather texts after the first one is queued
+            max_concurrency: maximum number of upstream calls in flight at once
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must be non-negative.")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+
+        self.embedder = embedder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="embedding-batch"
+        )
+        self._collector = threading.Thread(
+            target=self._run, name="embedding-collector", daemon=True
+        )
+        self._collector.start()
+
+    def embed_batch(self, texts: Iterable[str]) -> np.ndarray:
+        """Embed texts, sharing upstream calls with other concurrent callers.
+
+        Args:
+            texts: Iterable of strings to embed.
+
+        Returns:
+            A NumPy array of shape (batch_size, embedding_dim) containing float32 vectors.
+        """
+        texts = list(texts)
+        if not texts:
+            raise ValueError("embed_batch() requires at least one text.")
+
+        futures: List[Future] = []
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BatchingEmbedder is closed.")
+            for text in texts:
+                future = self._in_flight.get(text)
+                if future is None:
+                    future = Future()
+                    self._in_flight[text] = future
+                    self._queue.put((text, time.monotonic()))
+                futures.append(future)
+
+        return np.stack([future.result() for future in futures]).astype("float32", copy=False)
+
+    def close(self) -> None:
+        """Stop accepting texts, flush everything queued and wait for upstream calls."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+
+        self._collector.join()
+        self._executor.shutdown(wait=True)
+
+    # ==========================================================
+    # COLLECTOR THREAD
+    # ==========================================================
+    def _collect(self) -> Tuple[List[str], bool]:
+        """Block for one text, then gather more until the window or batch fills.
+
+        Returns:
+            (batch, stop) where ``stop`` is set once the close sentinel is seen.
+        """
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+
+        text, enqueued_at = item
+        batch = [text]
+        deadline = enqueued_at + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    item = self._queue.get(timeout=remaining)
+                else:
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item[0])
+
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = self._collect()
+            if batch:
+                self._executor.submit(self._dispatch, batch)
+
+    # ==========================================================
+    # UPSTREAM CALLS (executor workers)
+    # ==========================================================
+    def _embed(self, batch: List[str]) -> np.ndarray:
+        vectors = self.embedder.embed_batch(batch)
+        if len(vectors) != len(batch):
+            raise ValueError(
+                f"Embedding service returned {len(vectors)} vectors for {len(batch)} inputs."
+            )
+        return vectors
+
+    @staticmethod
+    def _is_input_error(exc: Exception) -> bool:
+        """True when retrying a smaller batch could isolate the failure."""
+        if isinstance(exc, requests.HTTPError):
+            status = exc.response.status_code if exc.response is not None else None
+            return status is not None and 400 <= status < 500
+        if isinstance(exc, requests.RequestException):
+            return False
+        return isinstance(exc, ValueError)
+
+    def _embed_into(
+        self,
+        batch: List[str],
+        results: Dict[str, Tuple[Optional[np.ndarray], Optional[Exception]]],
+    ) -> None:
+        try:
+            vectors = self._embed(batch)
+        except Exception as exc:
+            if len(batch) == 1 or not self._is_input_error(exc):
+                for text in batch:
+                    results[text] = (None, exc)
+                return
+            # Bisect so a bad text only fails its own callers.
+            middle = len(batch) // 2
+            self._embed_into(batch[:middle], results)
+            self._embed_into(batch[middle:], results)
+            return
+
+        for text, vector in zip(batch, vectors):
+            results[text] = (vector, None)
+
+    def _dispatch(self, batch: List[str]) -> None:
+        results: Dict[str, Tuple[Optional[np.ndarray], Optional[Exception]]] = {}
+        try:
+            self._embed_into(batch, results)
+        finally:
+            # Drop texts from the in-flight map before resolving so a caller
+            # arriving afterwards never attaches to an already-settled future.
+            with self._lock:
+                futures = [(text, self._in_flight.pop(text, None)) for text in batch]
+
+            for text, future in futures:
+                if future is None or future.done():
+                    continue
+                vector, error = results.get(text, (None, None))
+                if vector is None and error is None:
+                    error = RuntimeError("Embedding dispatch aborted before producing a result.")
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(vector)
@@ -0,0 +1,173 @@
+import sys
+import threading
+from pathlib import Path
+import unittest
+
+import numpy as np
+import requests
+
+ROOT = Path(__file__).resolve().parents[1] / "src"
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from engine.batching_embedder import BatchingEmbedder  # noqa: E402
+
+
+class RecordingEmbedder:
+    """Returns len(text) as a 1-d vector and records every upstream call."""
+
+    def __init__(self, bad_text=None, slow_text=None, error=None):
+        self.calls = []
+        self.bad_text = bad_text
+        self.slow_text = slow_text
+        self.error = error
+        self.release = threading.Event()
+
+    def embed_batch(self, texts):
+        texts = list(texts)
+        self.calls.append(texts)
+        if self.slow_text in texts:
+            self.release.wait(timeout=5)
+        if self.error is not None:
+            raise self.error
+        if self.bad_text in texts:
+            raise http_error(400)
+        return np.asarray([[float(len(t))] for t in texts], dtype="float32")
+
+
+class Abort(BaseException):
+    pass
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+def start_callers(embedder, queries):
+    results = [None] * len(queries)
+    start = threading.Barrier(len(queries))
+
+    def worker(i, texts):
+        start.wait()
+        try:
+            results[i] = embedder.embed_batch(texts)
+        except Exception as exc:
+            results[i] = exc
+
+    threads = [threading.Thread(target=worker, args=(i, q)) for i, q in enumerate(queries)]
+    for t in threads:
+        t.start()
+    return threads, results
+
+
+def embed_concurrently(embedder, queries):
+    threads, results = start_callers(embedder, queries)
+    for t in threads:
+        t.join()
+    return results
+
+
+class BatchingEmbedderTests(unittest.TestCase):
+    def make_embedder(self, upstream, **kwargs):
+        embedder = BatchingEmbedder(upstream, **kwargs)
+        self.addCleanup(embedder.close)
+        return embedder
+
+    def test_concurrent_queries_are_batched_and_deduplicated(self):
+        upstream = RecordingEmbedder()
+        embedder = self.make_embedder(upstream, max_batch_size=32, max_wait_ms=200)
+
+        queries = [["a"], ["bb"], ["a"], ["ccc", "bb"]]
+        results = embed_concurrently(embedder, queries)
+
+        self.assertEqual(results[0].tolist(), [[1.0]])
+        self.assertEqual(results[1].tolist(), [[2.0]])
+        self.assertEqual(results[2].tolist(), [[1.0]])
+        self.assertEqual(results[3].tolist(), [[3.0], [2.0]])
+        self.assertEqual(results[0].dtype, np.float32)
+
+        self.assertEqual(len(upstream.calls), 1)
+        self.assertEqual(sorted(upstream.calls[0]), ["a", "bb", "ccc"])
+
+    def test_batches_are_capped_at_max_batch_size(self):
+        upstream = RecordingEmbedder()
+        embedder = self.make_embedder(upstream, max_batch_size=2, max_wait_ms=200)
+
+        result = embedder.embed_batch(["a", "bb", "ccc"])
+
+        self.assertEqual(result.tolist(), [[1.0], [2.0], [3.0]])
+        self.assertTrue(all(len(call) <= 2 for call in upstream.calls))
+
+    def test_failing_text_fails_only_its_own_callers(self):
+        upstream = RecordingEmbedder(bad_text="bad")
+        embedder = self.make_embedder(upstream, max_wait_ms=200)
+
+        results = embed_concurrently(embedder, [["x"], ["y"], ["bad"], ["z"], ["bad"]])
+
+        self.assertEqual(results[0].tolist(), [[1.0]])
+        self.assertEqual(results[1].tolist(), [[1.0]])
+        self.assertIsInstance(results[2], requests.HTTPError)
+        self.assertEqual(results[3].tolist(), [[1.0]])
+        self.assertIsInstance(results[4], requests.HTTPError)
+
+        # 4 texts bisected: the full batch, two halves, then the bad half split.
+        self.assertEqual(len(upstream.calls), 5)
+        self.assertEqual(sorted(upstream.calls[0]), ["bad", "x", "y", "z"])
+        self.assertIn(["bad"], upstream.calls)
+
+    def test_upstream_outage_fails_whole_batch_without_retries(self):
+        errors = (requests.ConnectionError("refused"), requests.Timeout("slow"), http_error(503))
+        for error in errors:
+            with self.subTest(error=type(error).__name__):
+                upstream = RecordingEmbedder(error=error)
+                embedder = self.make_embedder(upstream, max_wait_ms=200)
+
+                results = embed_concurrently(embedder, [["x"], ["y"], ["z"]])
+
+                self.assertEqual(len(upstream.calls), 1)
+                for result in results:
+                    self.assertIs(result, error)
+
+    def test_aborted_dispatch_does_not_orphan_callers(self):
+        upstream = RecordingEmbedder(error=Abort())
+        embedder = self.make_embedder(upstream, max_wait_ms=0)
+
+        with self.assertRaises(RuntimeError):
+            embedder.embed_batch(["a"])
+
+        upstream.error = None
+        self.assertEqual(embedder.embed_batch(["a"]).tolist(), [[1.0]])
+
+    def test_next_batch_is_dispatched_while_previous_is_upstream(self):
+        upstream = RecordingEmbedder(slow_text="slow")
+        embedder = self.make_embedder(
+            upstream, max_batch_size=1, max_wait_ms=0, max_concurrency=2
+        )
+
+        slow_threads, slow_results = start_callers(embedder, [["slow"]])
+        fast_threads, fast_results = start_callers(embedder, [["fast"]])
+
+        fast_threads[0].join(timeout=2)
+        self.assertFalse(fast_threads[0].is_alive())
+        self.assertEqual(fast_results[0].tolist(), [[4.0]])
+        self.assertIsNone(slow_results[0])
+
+        upstream.release.set()
+        slow_threads[0].join()
+        self.assertEqual(slow_results[0].tolist(), [[4.0]])
+
+    def test_close_flushes_queued_texts_and_rejects_new_ones(self):
+        embedder = BatchingEmbedder(RecordingEmbedder(), max_wait_ms=0)
+
+        self.assertEqual(embedder.embed_batch(["a"]).tolist(), [[1.0]])
+        embedder.close()
+        embedder.close()
+
+        with self.assertRaises(RuntimeError):
+            embedder.embed_batch(["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()